@@ -0,0 +1,70 @@
+# ************************************************************* #
+#  Compares the solvers of the WGUPS routing program: runtime   #
+#  and total fleet mileage of the monolithic simulation versus  #
+#  the cluster-decomposition mode, their optimality gaps, and   #
+#  how robust the plan is.                                      #
+# ************************************************************* #
+
+import sys
+import time
+import montecarlo
+from bounds import fleet_bounds, optimality_gap
+from common import timeFromMinutes
+from simulator import Simulator
+
+
+def run_solver(num_trucks, decompose) -> Simulator:
+    """ Runs one simulation and prints its runtime, mileage, missed deadlines and optimality gap """
+    simulator = Simulator(decompose=decompose)
+
+    start = time.perf_counter()
+    simulator.run(num_trucks)
+    elapsed = time.perf_counter() - start
+
+    mileage = sum(truck.get_mileage() for truck in simulator.get_trucks())
+    late = [p for (_, p) in simulator.get_packages() if p.get_delivered_at() >= p.deadline]
+
+    best_bound = max(bound for (_, bound) in fleet_bounds(simulator))
+
+    name = 'decomposed' if decompose else 'monolithic'
+    print(f'  {name:<12}{elapsed * 1000:>10.1f} ms{mileage:>10.1f} miles{len(late):>6} late'
+          f'    gap {optimality_gap(mileage, best_bound):.0%} over {best_bound:.1f} miles')
+
+    sequenced, memoized, fallbacks, solve_time = simulator.get_sequencer().get_stats()
+    print(f'  {"":<12}loads sequenced exactly: {sequenced} ({memoized} from memo) in'
+          f' {solve_time * 1000:.1f} ms, {fallbacks} left to the heuristic')
+
+    return simulator
+
+
+def print_robustness(simulator, samples=10000) -> None:
+    """ Prints a Monte Carlo robustness analysis of the plan of the given simulation """
+    start = time.perf_counter()
+    on_time, end_times = montecarlo.analyze(simulator, samples)
+    elapsed = time.perf_counter() - start
+
+    print(f'Robustness of the monolithic plan ({samples} samples, {elapsed:.1f} s):')
+    print('  end of day: ' + ', '.join(
+        f'{int(fraction * 100)}% {timeFromMinutes(montecarlo.percentile(end_times, fraction))}'
+        for fraction in [0.05, 0.5, 0.95]))
+
+    for (id_no, probability) in on_time:
+        if probability < 0.99:
+            print(f'  package #{id_no}: on time with probability {probability:.2f}')
+
+
+def main():
+    """
+    Runs the monolithic and the decomposed solver and prints the trade-off between them.
+    """
+    num_trucks = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+
+    print(f'Solver comparison ({num_trucks} trucks):')
+    simulator = run_solver(num_trucks, decompose=False)
+    run_solver(num_trucks, decompose=True)
+
+    print_robustness(simulator)
+
+
+if __name__ == '__main__':
+    main()
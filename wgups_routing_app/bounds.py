@@ -0,0 +1,273 @@
+import time
+
+from models.truck import Truck
+
+# Largest number of locations for which all shortest paths are computed exactly
+# (about half a second at this size); larger matrices use cheaper lower bounds.
+EXACT_SHORTEST_PATHS_LIMIT = 200
+
+
+def fleet_bounds(simulator, time_limit=2.0) -> list:
+    """
+    Returns lower bounds on the total mileage of any plan that delivers the packages
+    of a finished simulation, as a list of (name, bound) pairs. The depots are
+    treated as a single location, since every trip starts and ends at one of them.
+
+    The distance table does not satisfy the triangle inequality (a detour can be
+    shorter than the direct distance), and neither does the merged depot, so the
+    1-tree and capacity bounds are computed over the shortest-path distances (see
+    metric_closure). Beyond EXACT_SHORTEST_PATHS_LIMIT locations, where those take
+    too long, they are computed over cheaper lower bounds on the shortest-path
+    distances (see shortest_path_lower_bounds), which weakens the 1-tree bound.
+
+    The time limit (in seconds) covers the whole computation; the 1-tree bound gets
+    the time left after the other bounds, but always at least one iteration. One
+    iteration takes about a tenth of a second at 1,000 locations and grows
+    quadratically, so at thousands of locations the 1-tree bound gets few iterations
+    and, over the cheaper lower bounds, may fall below the MST bound. All three
+    bounds are always returned.
+
+    Time complexity is O(m^3) up to EXACT_SHORTEST_PATHS_LIMIT locations and O(m^2)
+    beyond, plus the iterations of the 1-tree bound, where m represents number of
+    delivery locations.
+    """
+    started = time.perf_counter()
+    graph = simulator.get_graph()
+    depots = [depot.get_address() for depot in simulator.get_depots() if depot.has_trucks()]
+
+    demands = {}
+    for (_, package) in simulator.get_packages():
+        demands[package.get_address()] = demands.get(package.get_address(), 0) + 1
+
+    locations = list(demands)
+    distances = graph.distance_matrix(depots + locations)
+    depot_rows = distances[:len(depots)]
+    matrix = [[0.0] + [min(row[len(depots) + j] for row in depot_rows) for j in range(len(locations))]]
+    for (idx, row) in enumerate(distances[len(depots):]):
+        matrix.append([matrix[0][idx + 1]] + row[len(depots):])
+
+    if len(matrix) <= EXACT_SHORTEST_PATHS_LIMIT:
+        lower_bounds = metric_closure(matrix)
+    else:
+        lower_bounds = shortest_path_lower_bounds(matrix)
+    mst = mst_bound(matrix)
+    capacity = capacity_bound(lower_bounds, [0] + [demands[location] for location in locations], Truck._max_capacity)
+
+    remaining_time = max(0.0, time_limit - (time.perf_counter() - started))
+    return [
+        ('MST', mst),
+        ('1-tree', one_tree_bound(lower_bounds, time_limit=remaining_time)),
+        ('capacity', capacity),
+    ]
+
+
+def optimality_gap(mileage, bound) -> float:
+    """ Returns how far (as a fraction of the bound) the given mileage is above the bound """
+    return (mileage - bound) / bound if bound > 0 else 0.0
+
+
+def mst_bound(matrix) -> float:
+    """
+    Returns the weight of a minimum spanning tree over all locations of the distance
+    matrix. Every plan visits all locations with closed trips from the depot, and
+    these trips together connect all locations, so no plan is shorter.
+
+    Time complexity is O(m^2).
+    """
+    cost, _ = _minimum_spanning_tree(matrix, list(range(len(matrix))), [0.0] * len(matrix))
+    return cost
+
+
+def metric_closure(matrix) -> list:
+    """
+    Returns the shortest-path distances between all locations of the distance matrix
+    (computed with the Floyd-Warshall algorithm), which satisfy the triangle
+    inequality. A plan can drive the shortest path between any two stops, so a lower
+    bound over these distances holds for the original ones.
+
+    Time complexity is O(m^3) while space complexity is O(m^2).
+    """
+    closure = [list(row) for row in matrix]
+    for k in range(len(closure)):
+        row_k = closure[k]
+        for row_i in closure:
+            via_k = row_i[k]
+            for (j, distance) in enumerate(row_k):
+                if via_k + distance < row_i[j]:
+                    row_i[j] = via_k + distance
+
+    return closure
+
+
+def shortest_path_lower_bounds(matrix) -> list:
+    """
+    Returns a distance matrix that can stand in for metric_closure without the cubic
+    cost of computing all shortest paths: no entry exceeds the shortest-path distance
+    between its locations, and the depot's row (row 0) holds the exact shortest-path
+    distances. Both the 1-tree and the capacity bound only grow with the distances,
+    so they stay lower bounds when computed over this matrix.
+
+    Entries between other locations are the largest of two lower bounds: a shortest
+    path is either the direct distance or leaves one location by its shortest edge
+    and enters the other by its shortest edge, and it is at least the difference of
+    the shortest-path distances of both locations from the depot.
+
+    Time complexity is O(m^2).
+    """
+    size = len(matrix)
+    from_depot = _shortest_paths_from(matrix, 0)
+    shortest_edges = [min(row[:i] + row[i + 1:], default=0.0) for (i, row) in enumerate(matrix)]
+
+    lower_bounds = [list(from_depot)]
+    for i in range(1, size):
+        edge_i = shortest_edges[i]
+        depot_i = from_depot[i]
+        row = [d if d < edge_i + e else edge_i + e for (d, e) in zip(matrix[i], shortest_edges)]
+        row = [d if d > depot_i - r and d > r - depot_i else abs(depot_i - r) for (d, r) in zip(row, from_depot)]
+        row[0] = depot_i
+        row[i] = 0.0
+        lower_bounds.append(row)
+
+    return lower_bounds
+
+
+def one_tree_bound(matrix, iterations=100, time_limit=2.0, upper_bound=None) -> float:
+    """
+    Returns the Held-Karp lower bound on the shortest round trip through all locations
+    of the distance matrix, which no plan can beat (joining its trips at the depot gives
+    such a round trip, and skipping repeated visits only shortens it, provided no
+    distance exceeds a shortest path; see metric_closure). The bound is
+    computed by subgradient optimization over 1-trees: a minimum spanning tree over all
+    locations but the depot (row 0), plus the depot's two shortest edges. Location
+    penalties are raised where the 1-tree has more than two edges and lowered where it
+    has fewer, until the iterations or the time limit (in seconds) run out. Step sizes
+    are scaled by the gap to upper_bound, an estimate of the shortest round trip
+    (raised along with the bound if the bound gets close to it).
+
+    Time complexity is O(i * m^2), where i represents number of iterations.
+    """
+    size = len(matrix)
+    if size < 3:
+        return 2 * matrix[0][1] if size == 2 else 0.0
+
+    started = time.perf_counter()
+    others = list(range(1, size))
+    penalties = [0.0] * size
+    upper_bound = upper_bound or 1.1 * mst_bound(matrix)
+    step_scale = 2.0
+    best = 0.0
+    iterations_without_improvement = 0
+
+    for _ in range(iterations):
+        cost, degrees = _minimum_spanning_tree(matrix, others, penalties)
+
+        depot_edges = sorted(matrix[0][j] + penalties[j] for j in others)
+        cost += depot_edges[0] + depot_edges[1]
+        nearest = sorted(others, key=lambda j: matrix[0][j] + penalties[j])[:2]
+        for j in nearest:
+            degrees[j] += 1
+
+        bound = cost - 2 * sum(penalties)
+        if bound > best + 1e-9:
+            best = bound
+            iterations_without_improvement = 0
+        else:
+            iterations_without_improvement += 1
+            if iterations_without_improvement == 5:
+                step_scale /= 2
+                iterations_without_improvement = 0
+
+        subgradient = [degrees[j] - 2 for j in range(size)]
+        norm = sum(g * g for g in subgradient[1:])
+        if norm == 0 or time.perf_counter() - started > time_limit:
+            # A 1-tree in which every location has two edges is a round trip.
+            break
+
+        # Keep the target above the best bound so far, so steps never turn around.
+        step = step_scale * (max(upper_bound, 1.05 * best) - bound) / norm
+        for j in others:
+            penalties[j] += step * subgradient[j]
+
+    return best
+
+
+def capacity_bound(matrix, demands, capacity) -> float:
+    """
+    Returns a lower bound that accounts for the truck capacity: a trip carrying a
+    package to a location drives at least twice the distance from the depot to that
+    location, and a trip carries at most capacity packages, so a package takes at
+    least 2 * distance / capacity miles of its trip. The depot's distances must be
+    the shortest ones (see metric_closure).
+
+    Time complexity is O(m).
+    """
+    return sum(2 * matrix[0][j] * demands[j] for j in range(1, len(matrix))) / capacity
+
+
+def _minimum_spanning_tree(matrix, nodes, penalties) -> tuple:
+    """
+    Computes a minimum spanning tree over the given nodes with Prim's algorithm, where
+    the weight of an edge is its distance plus the penalties of both its ends. Returns
+    the weight of the tree and the degree of every node in it.
+
+    Time complexity is O(k^2), where k is the number of given nodes.
+    """
+    degrees = [0] * len(matrix)
+    if len(nodes) < 2:
+        return 0.0, degrees
+
+    root = nodes[0]
+    remaining = nodes[1:]
+    keys = [matrix[root][j] + penalties[root] + penalties[j] for j in remaining]
+    parents = [root] * len(remaining)
+    cost = 0.0
+
+    while len(remaining) != 0:
+        idx = min(range(len(remaining)), key=keys.__getitem__)
+        node, parent = remaining[idx], parents[idx]
+        cost += keys[idx]
+        degrees[node] += 1
+        degrees[parent] += 1
+
+        # Remove the node by moving the last one into its place.
+        remaining[idx], keys[idx], parents[idx] = remaining[-1], keys[-1], parents[-1]
+        remaining.pop()
+        keys.pop()
+        parents.pop()
+
+        row = matrix[node]
+        penalty = penalties[node]
+        for (i, j) in enumerate(remaining):
+            weight = row[j] + penalty + penalties[j]
+            if weight < keys[i]:
+                keys[i] = weight
+                parents[i] = node
+
+    return cost, degrees
+
+
+def _shortest_paths_from(matrix, source) -> list:
+    """
+    Returns the shortest-path distances from the given location to all locations of
+    the distance matrix, using Dijkstra's algorithm over the complete graph.
+
+    Time complexity is O(m^2).
+    """
+    size = len(matrix)
+    distances = list(matrix[source])
+    distances[source] = 0.0
+    remaining = [j for j in range(size) if j != source]
+
+    while len(remaining) != 0:
+        idx = min(range(len(remaining)), key=lambda i: distances[remaining[i]])
+        node = remaining[idx]
+        remaining[idx] = remaining[-1]
+        remaining.pop()
+
+        row = matrix[node]
+        via = distances[node]
+        for j in remaining:
+            if via + row[j] < distances[j]:
+                distances[j] = via + row[j]
+
+    return distances
@@ -0,0 +1,89 @@
+import math
+
+
+def partition_locations(graph, depot, locations, weights, capacity, max_iterations=20) -> [[str]]:
+    """
+    Partitions the given locations into geographic clusters using k-medoids over the
+    distance table. The number of clusters is the number of truck loads needed for the
+    total weight (number of packages) of the locations, and each cluster is filled up
+    to one truck load where possible.
+
+    Time complexity is O(i * (m * k + c^2)), where i, m, k and c represent the number of
+    iterations, locations, clusters and the size of the largest cluster respectively.
+    """
+    if len(locations) == 0:
+        return []
+
+    k = min(len(locations), max(1, math.ceil(sum(weights) / capacity)))
+    medoids = _initial_medoids(graph, depot, locations, k)
+
+    clusters = []
+    for _ in range(max_iterations):
+        clusters = _assign_to_medoids(graph, locations, weights, medoids, capacity)
+        new_medoids = [_medoid(graph, cluster) or medoid for (cluster, medoid) in zip(clusters, medoids)]
+        if new_medoids == medoids:
+            break
+        medoids = new_medoids
+
+    return [cluster for cluster in clusters if len(cluster) != 0]
+
+
+def _initial_medoids(graph, depot, locations, k) -> [str]:
+    """
+    Picks k locations spread far apart (farthest-first traversal), starting with
+    the location farthest from the depot.
+
+    Time complexity is O(m * k).
+    """
+    nearest_medoid = [graph.get_distance(depot, location) for location in locations]
+    medoids = []
+    for _ in range(k):
+        farthest = max(range(len(locations)), key=lambda idx: nearest_medoid[idx])
+        medoids.append(locations[farthest])
+        for idx, location in enumerate(locations):
+            nearest_medoid[idx] = min(nearest_medoid[idx], graph.get_distance(locations[farthest], location))
+
+    return medoids
+
+
+def _assign_to_medoids(graph, locations, weights, medoids, capacity) -> [[str]]:
+    """
+    Assigns every location to the nearest medoid whose cluster still has room for
+    its weight. Locations that would lose the most by not getting their nearest
+    medoid (the largest regret) are assigned first; a location that fits nowhere
+    goes to its nearest medoid.
+
+    Time complexity is O(m * k * log(m * k)).
+    """
+    ranked = []
+    for idx, location in enumerate(locations):
+        distances = sorted((graph.get_distance(location, medoid), m) for (m, medoid) in enumerate(medoids))
+        regret = distances[1][0] - distances[0][0] if len(distances) > 1 else 0.0
+        ranked.append((-regret, idx, [m for (_, m) in distances]))
+    ranked.sort()
+
+    clusters = [[] for _ in medoids]
+    loads = [0] * len(medoids)
+    for (_, idx, preferred) in ranked:
+        chosen = preferred[0]
+        for m in preferred:
+            if loads[m] + weights[idx] <= capacity:
+                chosen = m
+                break
+        clusters[chosen].append(locations[idx])
+        loads[chosen] += weights[idx]
+
+    return clusters
+
+
+def _medoid(graph, cluster) -> str:
+    """
+    Returns the location of the cluster with the least total distance to the
+    other locations of the cluster.
+
+    Time complexity is O(c^2).
+    """
+    if len(cluster) == 0:
+        return None
+
+    return min(cluster, key=lambda location: sum(graph.get_distance(location, other) for other in cluster))
@@ -0,0 +1,189 @@
+import http.client
+import json
+import os
+import queue
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DistanceProvider(ABC):
+    """
+    Supplies distances between addresses that are missing from the distance table.
+    Distances are fetched ahead of time with prefetch() so that looking them up with
+    get_cached() during the simulation never blocks.
+    """
+
+    @abstractmethod
+    def prefetch(self, pairs) -> None:
+        """
+        Fetches and caches the distances for the given (address, address) pairs.
+        """
+
+    @abstractmethod
+    def get_cached(self, v1, v2) -> float:
+        """
+        Returns the cached distance between the given addresses, or None if it has
+        not been fetched.
+        """
+
+
+class RoutingServiceProvider(DistanceProvider):
+    """
+    A distance provider backed by a routing service reachable over HTTP.
+
+    Missing pairs are sent in batches as distance matrix requests:
+        POST <path>  {"sources": [address, ...], "destinations": [address, ...]}
+    answered with
+        {"distances": [[miles from each source to each destination], ...]}
+
+    Requests reuse a pool of keep-alive connections. Results are kept in a bounded
+    LRU cache and, if a cache file is given, on disk so that later runs do not ask
+    for them again.
+    """
+
+    def __init__(self, host, port=80, path='/matrix', cache_size=100000, cache_file=None,
+                 batch_size=50, pool_size=4, timeout=10.0):
+        self._host = host
+        self._port = port
+        self._path = path
+        self._batch_size = batch_size
+        self._pool_size = pool_size
+        self._timeout = timeout
+        self._connections = queue.Queue()
+        self._cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_file = cache_file
+        self._load_cache_file()
+
+    def prefetch(self, pairs) -> None:
+        """
+        Fetches the distances for the given pairs that are not cached yet. The pairs
+        are grouped into matrix requests of at most batch_size sources by batch_size
+        destinations, which are sent concurrently over the connection pool.
+
+        The given pairs are the most recently used entries of the cache afterwards, so
+        none of them is evicted until distances for other pairs are cached. The pairs
+        must therefore fit in the cache.
+        """
+        pairs = list(pairs)
+        if len(set(self._key(v1, v2) for (v1, v2) in pairs)) > self._cache_size:
+            raise Exception(f'cannot prefetch more than {self._cache_size} distances; raise cache_size')
+
+        missing = {}
+        for (v1, v2) in pairs:
+            if self.get_cached(v1, v2) is None:
+                missing.setdefault(str(v1), set()).add(str(v2))
+
+        batches = []
+        sources = sorted(missing)
+        for i in range(0, len(sources), self._batch_size):
+            batch_sources = sources[i:i + self._batch_size]
+            destinations = sorted(set().union(*[missing[source] for source in batch_sources]))
+            for j in range(0, len(destinations), self._batch_size):
+                batches.append((batch_sources, destinations[j:j + self._batch_size]))
+
+        if len(batches) == 0:
+            return
+
+        with ThreadPoolExecutor(self._pool_size) as executor:
+            for _ in executor.map(self._fetch_matrix, batches):
+                pass
+
+        self._save_cache_file()
+
+    def get_cached(self, v1, v2) -> float:
+        """
+        Returns the cached distance between the given addresses, or None if it has
+        not been fetched. Distances are symmetric, as in the distance table.
+        """
+        key = self._key(v1, v2)
+        with self._cache_lock:
+            distance = self._cache.get(key)
+            if distance is not None:
+                self._cache.move_to_end(key)
+        return distance
+
+    def close(self) -> None:
+        """ Closes the pooled connections """
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+    def _fetch_matrix(self, batch) -> None:
+        """
+        Sends one matrix request and caches its distances.
+        """
+        sources, destinations = batch
+        body = json.dumps({'sources': sources, 'destinations': destinations})
+        response = self._post(body)
+
+        for (source, row) in zip(sources, response['distances']):
+            for (destination, distance) in zip(destinations, row):
+                if distance is not None:
+                    self._put_cached(source, destination, float(distance))
+
+    def _post(self, body) -> dict:
+        """
+        Posts the given JSON body on a pooled connection and returns the decoded
+        response. A connection that went stale or timed out is replaced and the
+        request retried once.
+        """
+        try:
+            connection = self._connections.get_nowait()
+        except queue.Empty:
+            connection = http.client.HTTPConnection(self._host, self._port, timeout=self._timeout)
+
+        for attempt in range(2):
+            try:
+                connection.request('POST', self._path, body, {'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                data = response.read()
+                if response.status != 200:
+                    connection.close()
+                    raise Exception(f'routing service responded {response.status}: {data[:200]}')
+                self._connections.put(connection)
+                return json.loads(data)
+            except (http.client.HTTPException, OSError):
+                connection.close()
+                if attempt == 1:
+                    raise
+                connection = http.client.HTTPConnection(self._host, self._port, timeout=self._timeout)
+
+    def _put_cached(self, v1, v2, distance) -> None:
+        """ Caches a distance, evicting the least recently used one when full """
+        key = self._key(v1, v2)
+        with self._cache_lock:
+            self._cache[key] = distance
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def _load_cache_file(self) -> None:
+        """ Loads the distances cached on disk by a previous run, if any """
+        if self._cache_file is None or not os.path.exists(self._cache_file):
+            return
+
+        with open(self._cache_file) as cache_file:
+            for (v1, v2, distance) in json.load(cache_file):
+                self._put_cached(v1, v2, distance)
+
+    def _save_cache_file(self) -> None:
+        """ Writes the cached distances to disk """
+        if self._cache_file is None:
+            return
+
+        with self._cache_lock:
+            entries = [[v1, v2, distance] for ((v1, v2), distance) in self._cache.items()]
+
+        temp_file = self._cache_file + '.tmp'
+        with open(temp_file, 'w') as cache_file:
+            json.dump(entries, cache_file)
+        os.replace(temp_file, self._cache_file)
+
+    @staticmethod
+    def _key(v1, v2) -> tuple:
+        """ Returns the cache key of a pair of addresses, regardless of their order """
+        v1, v2 = str(v1), str(v2)
+        return (v1, v2) if v1 <= v2 else (v2, v1)
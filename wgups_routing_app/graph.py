@@ -4,9 +4,12 @@ class Graph:
     """
     A graph structures that uses a hashtable structure to store
     the graph's information (vertices, edges and weight of the edges).
+    Distances missing from the graph can be supplied by a distance provider
+    (see distance_provider.DistanceProvider).
     """
-    def __init__(self):
+    def __init__(self, provider=None):
         self.__info = HashTable()
+        self.__provider = provider
 
     def add_vertex(self, vertex) -> None:
         """
@@ -24,6 +27,56 @@ class Graph:
 
     def get_distance(self, v1, v2) -> float:
         """
-        Returns the distance between vertex v1 and vertex v2.
+        Returns the distance between vertex v1 and vertex v2. Distances missing from
+        this graph are taken from the distance provider's cache, so this never waits on
+        the provider; None is returned if the distance is not known.
         """
-        return self.__info.get(v1).get(v2)
+        edges = self.__info.get(v1)
+        distance = None if edges is None else edges.get(v2)
+        if distance is None and self.__provider is not None:
+            distance = 0.0 if v1 == v2 else self.__provider.get_cached(v1, v2)
+        return distance
+
+    def distance_matrix(self, addresses) -> list:
+        """
+        Returns the distances between all pairs of the given addresses as a list of
+        rows, with None where a distance is not known. The edges of every address are
+        looked up once, which is much faster than calling get_distance for every pair.
+
+        Time complexity is O(a * (a + v)), where a and v represent number of addresses
+        and number of vertices respectively.
+        """
+        matrix = []
+        for v1 in addresses:
+            edges = self.__info.get(v1)
+            known = {} if edges is None else {str(v2): distance for (v2, distance) in edges}
+            row = []
+            for v2 in addresses:
+                distance = known.get(str(v2))
+                if distance is None and self.__provider is not None:
+                    distance = 0.0 if v1 == v2 else self.__provider.get_cached(v1, v2)
+                row.append(distance)
+            matrix.append(row)
+        return matrix
+
+    def prefetch(self, addresses) -> None:
+        """
+        Has the distance provider fetch every distance missing from this graph between
+        the given addresses, and between them and the vertices of this graph. Pairs the
+        provider has cached already are passed on too, so that it keeps them cached.
+
+        Time complexity is O((a + v) * a), where a and v represent number of addresses
+        and number of vertices respectively.
+        """
+        if self.__provider is None:
+            return
+
+        vertices = [vertex for (vertex, _) in self.__info]
+        missing = []
+        for (idx, v1) in enumerate(addresses):
+            edges = self.__info.get(v1)
+            for v2 in vertices + addresses[idx + 1:]:
+                if v1 != v2 and (edges is None or edges.get(v2) is None):
+                    missing.append((v1, v2))
+
+        self.__provider.prefetch(missing)
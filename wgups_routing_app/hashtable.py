@@ -50,7 +50,7 @@ class HashTable(object):
             return None
 
     def __contains__(self, key):
-        for (k, _) in self._buckets[self.__hash(key)]:
+        for (k, _) in self._buckets[self.__hash(key)] or []:
             if k == key:
                 return True
 
@@ -58,4 +58,50 @@ class HashTable(object):
 
     def __iter__(self):
         for bucket in self._buckets:
-            yield from bucket
+            yield from bucket or []
+
+    def isempty(self) -> bool:
+        """ Returns True if this hashtable holds no items """
+        return all(bucket is None for bucket in self._buckets)
+
+
+class OverlayHashTable(HashTable):
+    """
+    A hashtable layered on top of a parent hashtable. Look-ups fall back to the
+    parent (and its parents) while insertions only go to this layer, so the parent
+    is shared rather than copied.
+    """
+
+    def __init__(self, parent, length=4):
+        super().__init__(length)
+        self._parent = parent
+
+    def get_parent(self):
+        """ Returns the hashtable this layer is on top of """
+        return self._parent
+
+    def _layers(self):
+        """ Yields this layer and the hashtables below it, from the top down """
+        layer = self
+        while layer is not None:
+            yield layer
+            layer = layer._parent if isinstance(layer, OverlayHashTable) else None
+
+    def get(self, key):
+        """ Returns the value pointed to by the given key in the topmost layer holding it """
+        for layer in self._layers():
+            value = HashTable.get(layer, key)
+            if value is not None:
+                return value
+        return None
+
+    def __contains__(self, key):
+        return any(HashTable.__contains__(layer, key) for layer in self._layers())
+
+    def __iter__(self):
+        seen = set()
+        for layer in self._layers():
+            for (k, v) in HashTable.__iter__(layer):
+                if k not in seen:
+                    seen.add(k)
+                    yield [k, v]
@@ -9,6 +9,7 @@
 # ************************************************************* #
 
 import sys
+from bounds import fleet_bounds, optimality_gap
 from simulator import Simulator
 from models.truck import Truck
 
@@ -94,14 +95,24 @@ def print_all_packages_inline(packages, time):
         print(package.brief(time))
 
 
-def print_trucks_mileage(trucks):
-    """ Prints the truck's mileage information """
+def print_trucks_mileage(trucks, mileage_bounds):
+    """ Prints the truck's mileage information and how far the total is above the best lower bound """
 
     print("Trucks mileage (in miles):")
 
     for truck in trucks:
         print(f'  Truck #{truck.get_id()}: {round(truck.get_mileage(), 1)}')
 
+    total = sum(truck.get_mileage() for truck in trucks)
+    print(f'  Total: {round(total, 1)}')
+
+    print("Lower bounds on the total mileage (in miles):")
+    for (name, bound) in mileage_bounds:
+        print(f'  {name}: {round(bound, 1)}')
+
+    best = max(bound for (_, bound) in mileage_bounds)
+    print(f'  Optimality gap: at most {optimality_gap(total, best):.0%}')
+
 
 def main():
     """
@@ -122,6 +133,9 @@ def main():
     # Retrieve mileage information of the trucks.
     trucks = simulator.get_trucks()
 
+    # Determine how far from the best possible plan the mileage can be.
+    mileage_bounds = fleet_bounds(simulator)
+
     done = False
     while not done:
         menu()
@@ -140,7 +154,7 @@ def main():
             elif option == '3':
                 print_all_packages_inline(packages, time)
         elif option == '4':
-            print_trucks_mileage(trucks)
+            print_trucks_mileage(trucks, mileage_bounds)
         elif option == '5':
             done = True
         else:
@@ -0,0 +1,20 @@
+from models.location import Location
+
+class Depot(Location):
+    """ A class to represent a depot (hub) where trucks start and end their trips """
+    def __init__(self, address_zip, name_address='') -> None:
+        """ Creates a depot located at the given address+zip """
+        super().__init__(address_zip, name_address)
+        self._trucks = []
+
+    def add_truck(self, truck) -> None:
+        """ Assigns the given truck to this depot as its home depot """
+        self._trucks.append(truck)
+
+    def get_trucks(self) -> list:
+        """ Returns the trucks whose home is this depot """
+        return self._trucks
+
+    def has_trucks(self) -> bool:
+        """ Returns True if at least one truck is based at this depot """
+        return len(self._trucks) != 0
@@ -19,6 +19,7 @@ class Package:
         self._status = PackageStatus.AT_THE_HUB
         self._wrong_address = False
         self._required_truck = None
+        self._depot = None
         self._loaded_at = None
         self._delivered_by = None
         self._delivered_at = None
@@ -37,14 +38,37 @@ class Package:
     def get_associated_packages(self):
         return self._associated_packages
 
+    def get_available_at(self):
+        return self._available_at
+
+    def delay_until(self, time: float) -> None:
+        """
+        Makes this package unavailable for loading before the given time
+        (for instance, when it arrives late at the hub).
+        """
+        self._available_at = max(self._available_at, time)
+
+    def get_required_truck(self):
+        return self._required_truck
+
+    def get_depot(self):
+        return self._depot
+
+    def set_depot(self, depot) -> None:
+        """
+        Assigns this package to the depot whose trucks will deliver it;
+        None lets trucks of any depot deliver it.
+        """
+        self._depot = depot
+
 
     def is_urgent(self, time: float) -> bool:
         return self.at_the_hub() and self.deadline < EOD and self._available_at <= time
 
-    def is_available(self, truck, exclude: set = set()) -> bool:
+    def is_available(self, truck, exclude: set = None) -> bool:
         """
-        Determines if this package (and recursively its associated ones) is
-        available for delivery by the current truck
+        Determines if this package (and recursively its associated ones that are
+        still at the hub) is available for delivery by the current truck
         """
         if self._wrong_address:
             return False
@@ -58,12 +82,16 @@ class Package:
         if self._required_truck is not None and self._required_truck != truck.get_id():
             return False
 
-        deps_available = True
+        if self._depot is not None and self._depot != truck.get_depot():
+            return False
+
+        exclude = set() if exclude is None else exclude
         exclude.add(self)
-        for deps in [d for d in self.associated if not d in exclude]:
-            deps_available = deps.is_available(truck, exclude)
+        for deps in [d for d in self.associated if not d in exclude and d.at_the_hub()]:
+            if not deps.is_available(truck, exclude):
+                return False
 
-        return deps_available
+        return True
 
     def _retrieve_note(self, notes: str) -> None:
         """
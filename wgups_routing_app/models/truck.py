@@ -5,16 +5,30 @@ class Truck:
     _speed = 18
     _count = 0
 
-    def __init__(self):
+    def __init__(self, depot, departure=8 * 60):
         self._id = self._increment_count()
+        self._depot = depot
+        self._departure = departure
+        self._waited = 0.0
         self._packages = []
         self._mileage = 0.0
         self._packages = []
         self._delivered = 0
+        # Every trip made: the (distance, package) legs driven and the distance back.
+        self._trips = []
 
     def get_id(self):
         return self._id
 
+    def get_depot(self):
+        return self._depot
+
+    def get_departure(self):
+        return self._departure
+
+    def get_trips(self):
+        return self._trips
+
     def get_mileage(self):
         return self._mileage
 
@@ -25,22 +39,32 @@ class Truck:
         return self._packages
 
     def get_time(self) -> float:
-        return (8 * 60) + (self._mileage / self._speed * 60)
+        return self._departure + self._waited + (self._mileage / self._speed * 60)
+
+    def wait_until(self, time: float) -> None:
+        """
+        Keeps this truck at its depot until the given time.
+        """
+        self._waited += max(0.0, time - self.get_time())
 
     def available_space(self) -> int:
         return self._max_capacity - len(self._packages)
     
     def deliver(self, graph) -> None:
         """
-        Takes all packages in this truck to their destinations.
+        Takes all packages in this truck to their destinations and returns
+        to the truck's home depot.
         """
         self._delivered += 1
         prev = ''
-        curr = 'HUB'
+        curr = self._depot.get_address()
+        legs = []
         for pkg in self._packages:
             prev = curr 
             curr  = pkg.get_address()
-            self._mileage += graph.get_distance(prev, curr )
+            distance = graph.get_distance(prev, curr)
+            self._mileage += distance
+            legs.append((distance, pkg))
             pkg.complete_delivery(self)
 
             info = f'truck {self._id}'
@@ -50,7 +74,9 @@ class Truck:
             info += f' mileage: {round(self._mileage, 1)} miles'
 
         self._packages.clear()
-        self._mileage += graph.get_distance(curr , 'HUB')      
+        return_distance = graph.get_distance(curr, self._depot.get_address())
+        self._mileage += return_distance
+        self._trips.append((legs, return_distance))
 
     def isempty(self) -> bool:
         return len(self._packages) == 0
@@ -65,8 +91,22 @@ class Truck:
         package.set_enroute(self)
         self._packages.append(package)
 
+    def reorder(self, packages) -> None:
+        """
+        Replaces the delivery order of the loaded packages with the given order.
+        """
+        if set(packages) != set(self._packages):
+            raise Exception
+
+        self._packages = list(packages)
+
     def location(self) -> str:
-        return 'HUB' if self.isempty() else self._packages[-1].get_address()
+        return self._depot.get_address() if self.isempty() else self._packages[-1].get_address()
+
+    @staticmethod
+    def reset_count() -> None:
+        """ Restarts the truck numbering so that the next truck created is truck 1 """
+        Truck._count = 0
 
     @staticmethod
     def _increment_count() -> int:
@@ -0,0 +1,147 @@
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from models.truck import Truck
+
+
+def analyze(simulator, samples=10000, speed_sd=2.0, flight_delay=20.0, service_time=2.0,
+            workers=None, batch_size=500, seed=0) -> tuple:
+    """
+    Estimates how robust the plan of a finished simulation is. The trips of the plan
+    are kept fixed and re-timed under random perturbations:
+      - every truck drives at a speed drawn from a normal distribution around the
+        truck speed, with standard deviation speed_sd (in mph);
+      - packages that become available after the start of the day (late flights and
+        the address correction) arrive an exponentially distributed delay with mean
+        flight_delay (in minutes) later; packages that arrived together are delayed
+        together;
+      - every stop takes an exponentially distributed service time with mean
+        service_time (in minutes).
+    A trip cannot leave before all its packages have arrived.
+
+    Samples are re-timed in batches of batch_size spread over a process pool.
+    Returns a list of (package ID, probability of on-time delivery) ordered by
+    package ID, and the sorted list of sampled end-of-day times (the time at which
+    the last truck is back, in minutes).
+
+    Time complexity is O(s * n), where s and n represent number of samples and
+    number of packages respectively.
+    """
+    plan = _extract_plan(simulator)
+
+    batches = []
+    for (idx, first) in enumerate(range(0, samples, batch_size)):
+        count = min(batch_size, samples - first)
+        batches.append((plan, count, speed_sd, flight_delay, service_time, seed + idx))
+
+    on_time_counts = [0] * len(plan['ids'])
+    end_times = []
+    with ProcessPoolExecutor(workers or os.cpu_count()) as executor:
+        for (counts, times) in executor.map(_retime_batch, batches):
+            for (idx, count) in enumerate(counts):
+                on_time_counts[idx] += count
+            end_times.extend(times)
+
+    end_times.sort()
+    on_time = [(id_no, count / samples) for (id_no, count) in zip(plan['ids'], on_time_counts)]
+    return on_time, end_times
+
+
+def percentile(sorted_values, fraction) -> float:
+    """ Returns the value below which the given fraction of the sorted values lie """
+    idx = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[idx]
+
+
+def _extract_plan(simulator) -> dict:
+    """
+    Flattens the trips made by the trucks of a finished simulation into plain lists
+    that can be sent to worker processes. Packages are referred to by their index in
+    the list of package IDs, and consecutive deliveries to the same address are
+    merged into one stop.
+
+    Either time or space complexity is O(n).
+    """
+    packages = sorted([package for (_, package) in simulator.get_packages()], key=lambda p: p.get_id_no())
+    index = {package.get_id_no(): idx for (idx, package) in enumerate(packages)}
+
+    start_of_day = min(truck.get_departure() for truck in simulator.get_trucks())
+
+    trucks = []
+    for truck in sorted(simulator.get_trucks(), key=lambda t: t.get_id()):
+        trips = []
+        for (legs, return_distance) in truck.get_trips():
+            if len(legs) == 0:
+                continue
+
+            stops = []
+            address = None
+            for (distance, package) in legs:
+                if package.get_address() != address or distance != 0:
+                    stops.append((distance, []))
+                    address = package.get_address()
+                stops[-1][1].append(index[package.get_id_no()])
+
+            trips.append((stops, return_distance, [index[p.get_id_no()] for (_, p) in legs]))
+        trucks.append((truck.get_departure(), trips))
+
+    return {
+        'ids': [package.get_id_no() for package in packages],
+        'deadlines': [package.deadline for package in packages],
+        'arrivals': [max(package.get_available_at(), start_of_day) for package in packages],
+        'start_of_day': start_of_day,
+        'speed': Truck._speed,
+        'trucks': trucks,
+    }
+
+
+def _retime_batch(batch) -> tuple:
+    """
+    Re-times the plan for a batch of random samples. The batch is processed stop by
+    stop, each step updating the clocks of all samples of the batch at once.
+    Returns the number of samples in which each package is delivered on time, and
+    the end-of-day time of every sample.
+
+    Time complexity is O(b * n), where b is the batch size.
+    """
+    plan, count, speed_sd, flight_delay, service_time, seed = batch
+    rng = random.Random(seed)
+    deadlines = plan['deadlines']
+    planned_arrivals = plan['arrivals']
+    start_of_day = plan['start_of_day']
+    samples = range(count)
+
+    # Sampled arrival times of every flight (packages arriving together).
+    flights = {}
+    for arrival in sorted(set(planned_arrivals)):
+        if arrival > start_of_day and flight_delay > 0:
+            flights[arrival] = [arrival + rng.expovariate(1 / flight_delay) for _ in samples]
+        else:
+            flights[arrival] = [arrival] * count
+
+    on_time_counts = [0] * len(deadlines)
+    end_times = [start_of_day] * count
+    for (departure, trips) in plan['trucks']:
+        minutes_per_mile = [60 / max(1.0, rng.gauss(plan['speed'], speed_sd)) for _ in samples]
+        clocks = [departure] * count
+        for (stops, return_distance, trip_packages) in trips:
+            # A trip leaves once the truck is back and all its packages have arrived.
+            for arrival in set(planned_arrivals[idx] for idx in trip_packages):
+                clocks = list(map(max, clocks, flights[arrival]))
+
+            for (distance, stop_packages) in stops:
+                if service_time > 0:
+                    clocks = [clock + distance * mpm + rng.expovariate(1 / service_time)
+                              for (clock, mpm) in zip(clocks, minutes_per_mile)]
+                else:
+                    clocks = [clock + distance * mpm for (clock, mpm) in zip(clocks, minutes_per_mile)]
+
+                for idx in stop_packages:
+                    deadline = deadlines[idx]
+                    on_time_counts[idx] += sum(1 for clock in clocks if clock < deadline)
+
+            clocks = [clock + return_distance * mpm for (clock, mpm) in zip(clocks, minutes_per_mile)]
+        end_times = list(map(max, end_times, clocks))
+
+    return on_time_counts, end_times
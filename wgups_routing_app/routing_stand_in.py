@@ -0,0 +1,98 @@
+# ************************************************************* #
+#  Runs the WGUPS routing program against a stand-in routing    #
+#  service, for trying out the HTTP distance provider without   #
+#  a real one. The stand-in answers distance matrix requests    #
+#  with made-up but stable distances, and the run adds a depot  #
+#  that is missing from the distance table so that its          #
+#  distances have to be fetched.                                #
+# ************************************************************* #
+
+import json
+import os
+import tempfile
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from distance_provider import RoutingServiceProvider
+from simulator import Simulator
+
+STAND_IN_DEPOT = '50 S Main St (84101)'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Answers POST requests for distance matrices the way the routing service does
+    (see distance_provider.RoutingServiceProvider). The distance between two
+    addresses is derived from a checksum of the addresses, between 1.0 and 9.0 miles.
+    """
+    protocol_version = 'HTTP/1.1'
+    requests_served = 0
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        distances = [[stand_in_distance(source, destination) for destination in body['destinations']]
+                     for source in body['sources']]
+        data = json.dumps({'distances': distances}).encode()
+        StandInHandler.requests_served += 1
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args) -> None:
+        """ Keeps the stand-in quiet """
+
+
+def stand_in_distance(v1, v2) -> float:
+    """ Returns the made-up distance between two addresses, the same in both directions """
+    if v1 == v2:
+        return 0.0
+    return 1.0 + zlib.crc32(''.join(sorted([v1, v2])).encode()) % 81 / 10
+
+
+def start_stand_in() -> ThreadingHTTPServer:
+    """ Starts the stand-in routing service on a free local port in a background thread """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_with_provider(port, cache_file, cache_size=100000) -> None:
+    """ Runs one simulation with two depots, fetching missing distances from the stand-in """
+    provider = RoutingServiceProvider('127.0.0.1', port, cache_size=cache_size, cache_file=cache_file)
+    served = StandInHandler.requests_served
+    try:
+        simulator = Simulator(depots=['HUB', STAND_IN_DEPOT], distance_provider=provider)
+        simulator.run(2)
+    finally:
+        provider.close()
+
+    mileage = sum(truck.get_mileage() for truck in simulator.get_trucks())
+    late = [p for (_, p) in simulator.get_packages() if p.get_delivered_at() >= p.deadline]
+    print(f'  {mileage:.1f} miles, {len(late)} late, {StandInHandler.requests_served - served} requests to the service')
+
+
+def main() -> None:
+    server = start_stand_in()
+    port = server.server_address[1]
+    cache_file = os.path.join(tempfile.mkdtemp(), 'distances.json')
+
+    print(f'Stand-in routing service on port {port}:')
+    run_with_provider(port, cache_file)
+    print('Again, with the distances cached on disk:')
+    run_with_provider(port, cache_file)
+
+    print('With a cache too small for the distances of the run:')
+    try:
+        run_with_provider(port, None, cache_size=10)
+    except Exception as e:
+        print(f'  {e}')
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
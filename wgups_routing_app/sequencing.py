@@ -0,0 +1,135 @@
+import time
+from functools import lru_cache
+
+from common import EOD
+from models.truck import Truck
+
+
+class LoadSequencer:
+    """
+    Finds the shortest order in which a truck can deliver its load, using the
+    Held-Karp dynamic programming algorithm over subsets of the load's stops.
+    Packages going to the same address make a single stop, and orders that would
+    deliver a package after its deadline are pruned. Solutions are memoized by stop
+    set (least recently used ones are dropped first), so repeated loads are not
+    solved again. Loads with more than max_stops stops are left to a heuristic.
+    """
+
+    def __init__(self, graph, max_stops=12, cache_size=1024):
+        self._graph = graph
+        self._max_stops = max_stops
+        self._solve = lru_cache(maxsize=cache_size)(self._held_karp)
+        self._solve_time = 0.0
+        self._sequenced = 0
+        self._fallbacks = 0
+
+    def sequence(self, truck) -> bool:
+        """
+        Reorders the packages loaded into the given truck in the shortest order that
+        delivers every package before its deadline. Returns False, leaving the order
+        unchanged, if the load has too many stops or no such order exists.
+
+        Time complexity is O(2^s * s^2), where s is the number of stops.
+        """
+        stops = []
+        packages_by_stop = {}
+        for package in truck.get_packages():
+            if package.get_address() not in packages_by_stop:
+                packages_by_stop[package.get_address()] = []
+                stops.append(package.get_address())
+            packages_by_stop[package.get_address()].append(package)
+
+        if len(stops) == 0:
+            return True
+
+        if len(stops) > self._max_stops:
+            self._fallbacks += 1
+            return False
+
+        # The best order of a load without deadlines does not depend on when the
+        # trip starts; leaving the start time out lets such loads share the memo.
+        start_time = truck.get_time()
+        deadlines = [min(p.deadline for p in packages_by_stop[stop]) for stop in stops]
+        if all(deadline >= EOD for deadline in deadlines):
+            start_time = None
+        key = tuple(sorted(zip(stops, deadlines)))
+
+        started = time.perf_counter()
+        order = self._solve(truck.get_depot().get_address(), key, start_time)
+        self._solve_time += time.perf_counter() - started
+
+        if order is None:
+            self._fallbacks += 1
+            return False
+
+        truck.reorder([package for stop in order for package in packages_by_stop[stop]])
+        self._sequenced += 1
+        return True
+
+    def get_stats(self) -> tuple:
+        """
+        Returns the number of loads sequenced exactly, the number of solutions taken from
+        the memo, the number of loads left to the heuristic, and the total solve time in
+        seconds.
+        """
+        return self._sequenced, self._solve.cache_info().hits, self._fallbacks, self._solve_time
+
+    def _held_karp(self, depot, stops, start_time) -> tuple:
+        """
+        Returns the addresses of the given (address, deadline) stops in the order of the
+        shortest trip from the depot through all of them and back, or None if no order
+        makes every deadline. Deadlines are ignored if the start time is None.
+
+        Time complexity is O(2^s * s^2) while space complexity is O(2^s * s).
+        """
+        count = len(stops)
+        if count == 0:
+            return ()
+
+        addresses = [address for (address, _) in stops] + [depot]
+        distances = [[self._graph.get_distance(a, b) for b in addresses] for a in addresses]
+        if any(distance is None for row in distances for distance in row):
+            return None
+
+        minutes_per_mile = 60 / Truck._speed
+        # Miles the truck can drive before reaching each stop too late.
+        if start_time is None:
+            budgets = [float('inf')] * count
+        else:
+            budgets = [(deadline - start_time) / minutes_per_mile for (_, deadline) in stops]
+
+        inf = float('inf')
+        full = (1 << count) - 1
+        costs = [[inf] * count for _ in range(full + 1)]
+        parents = [[-1] * count for _ in range(full + 1)]
+        for j in range(count):
+            if distances[count][j] < budgets[j]:
+                costs[1 << j][j] = distances[count][j]
+
+        for mask in range(1, full + 1):
+            row = costs[mask]
+            for j in range(count):
+                cost = row[j]
+                if cost == inf:
+                    continue
+                from_j = distances[j]
+                for k in range(count):
+                    if mask & (1 << k):
+                        continue
+                    new_cost = cost + from_j[k]
+                    next_mask = mask | (1 << k)
+                    if new_cost < costs[next_mask][k] and new_cost < budgets[k]:
+                        costs[next_mask][k] = new_cost
+                        parents[next_mask][k] = j
+
+        last = min(range(count), key=lambda j: costs[full][j] + distances[j][count])
+        if costs[full][last] == inf:
+            return None
+
+        order = []
+        mask = full
+        while last != -1:
+            order.append(addresses[last])
+            mask, last = mask & ~(1 << last), parents[mask][last]
+
+        return tuple(reversed(order))
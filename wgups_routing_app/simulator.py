@@ -1,19 +1,109 @@
 import csv
+import heapq
 
+from clustering import partition_locations
 from graph import Graph
 from models.truck import Truck
+from sequencing import LoadSequencer
+from models.depot import Depot
 from models.location import Location
 from models.package import Package
-from hashtable import HashTable
+from hashtable import HashTable, OverlayHashTable
+from common import EOD
 
 
 class Simulator:
 
-    def __init__(self):
+    def __init__(self, depots=None, decompose=False, distance_provider=None, exact_sequencing=True):
+        # Address+zip of every depot; trucks are spread over them round-robin.
+        self._depot_addresses = depots or ['HUB']
+        self._depots = None
+        # In decomposition mode trucks pick packages within geographic clusters.
+        self._decompose = decompose
+        self._clusters = None
+        self._cluster_packages = None
         self._trucks = None
         self._packages = None
+        # Packages that were at the hub when the last round started.
+        self._remaining_packages = None
         self._packages_with_wrong_address = None
+        self._urgent_heap = None
+        self._arrivals_heap = None
         self._graph = None
+        # Supplies the distances of addresses missing from the distance table.
+        self._distance_provider = distance_provider
+        # Reorders every truck load into its shortest order before it is delivered.
+        self._exact_sequencing = exact_sequencing
+        self._sequencer = None
+        # The parsed packages file, shared between a simulator and its forks.
+        self._manifest = None
+        # What-if changes: departure time by truck ID and arrival time by package ID.
+        self._num_trucks = None
+        self._departures = HashTable()
+        self._arrivals = HashTable()
+
+    def fork(self) -> 'Simulator':
+        """
+        Returns a new simulator for what-if analysis. The fork shares the distance graph,
+        the parsed packages and the what-if changes made so far with this simulator;
+        changes made to either one afterwards are layered on top of the shared ones and
+        are not seen by the other. Run the fork to re-simulate the day with its changes.
+
+        Either time or space complexity is O(1).
+        """
+        fork = Simulator(self._depot_addresses, self._decompose, self._distance_provider, self._exact_sequencing)
+        fork._graph = self._graph
+        fork._sequencer = self._sequencer
+        fork._manifest = self._manifest
+        fork._num_trucks = self._num_trucks
+
+        fork._departures = self._fork_changes('_departures')
+        fork._arrivals = self._fork_changes('_arrivals')
+
+        return fork
+
+    def _fork_changes(self, name) -> OverlayHashTable:
+        """
+        Returns a new layer for a fork on top of the what-if changes in the given
+        attribute, and gives this simulator a layer of its own if it does not have an
+        empty one already; the changes below both layers are shared and no longer
+        modified. Time complexity is O(1).
+        """
+        changes = getattr(self, name)
+        if isinstance(changes, OverlayHashTable) and changes.isempty():
+            return OverlayHashTable(changes.get_parent())
+
+        setattr(self, name, OverlayHashTable(changes))
+        return OverlayHashTable(changes)
+
+    def set_departure(self, truck_id, time: float) -> None:
+        """ Makes the truck with the given ID leave its depot at the given time (in minutes) """
+        self._departures.put(truck_id, time)
+
+    def set_arrival(self, package_id, time: float) -> None:
+        """
+        Makes the package with the given ID arrive at the hub at the given time (in minutes).
+        Packages that must be delivered with it stay at the hub until it arrives.
+        """
+        self._arrivals.put(package_id, time)
+
+    def compare(self, other) -> list:
+        """
+        Compares the delivery times of this simulation with those of another one (for
+        instance, a fork with its parent). Returns a list of (package ID, delivery time
+        in this simulation, delivery time in the other simulation) for every package
+        whose delivery time differs, ordered by package ID.
+
+        Time complexity is O(n).
+        """
+        differences = []
+        for (id_no, package) in self._packages:
+            other_time = other.get_packages().get(id_no).get_delivered_at()
+            if package.get_delivered_at() != other_time:
+                differences.append((id_no, package.get_delivered_at(), other_time))
+
+        differences.sort()
+        return differences
 
     def get_remaining(self):
         """ Return the number of undelivered packages """
@@ -23,18 +113,51 @@ class Simulator:
                 total += 1
         return total
 
-    def run(self, num_trucks) -> None:
+    def run(self, num_trucks=None) -> None:
         """
-        Determines how to deliver packages efficiently.
+        Determines how to deliver packages efficiently. If the number of trucks is not
+        given, the number used by the previous run (or the run the simulator was forked
+        after) is used; it must be given if there was no such run.
 
         Either space or time complexity for this algorithm is O(m^2) + O(n),
         where m and n represent number of delivery locations and number of packages
         respectively.
         """
 
+        self._num_trucks = num_trucks or self._num_trucks
+        if self._num_trucks is None:
+            raise Exception('the number of trucks is required for the first run')
+        self._packages_with_wrong_address = None
+
         destinations = self._load_packages()
-        self._load_distances()
-        self._trucks = [Truck() for i in range(num_trucks)]
+        if self._graph is None:
+            self._load_distances()
+
+        if self._exact_sequencing and self._sequencer is None:
+            self._sequencer = LoadSequencer(self._graph)
+
+        # Fetch the distances missing from the table before routing starts, so that
+        # looking them up while routing never waits on the distance provider.
+        self._graph.prefetch(self._depot_addresses + [address for (address, _) in destinations if address != ''])
+        for (address, _) in destinations:
+            for depot_address in self._depot_addresses:
+                if address != '' and self._graph.get_distance(depot_address, address) is None:
+                    raise Exception(f'the distance from {depot_address} to {address} is unknown')
+        self._depots = [Depot(address) for address in self._depot_addresses]
+        self._trucks = []
+        Truck.reset_count()
+        for i in range(self._num_trucks):
+            depot = self._depots[i % len(self._depots)]
+            truck = Truck(depot, self._departures.get(i + 1) or 8 * 60)
+            depot.add_truck(truck)
+            self._trucks.append(truck)
+
+        self._remaining_packages = [p[1] for p in self._packages]
+        self._assign_depots(self._remaining_packages)
+        self._build_urgent_heap()
+
+        if self._decompose:
+            self._cluster_packages_by_location(destinations)
 
         urgent_packages = True
 
@@ -60,7 +183,7 @@ class Simulator:
         Either space or time complexity is O(n^2) as it is for a nested loop.
         """
 
-        self._graph = Graph()
+        self._graph = Graph(self._distance_provider)
         with open('data/wgups_distance_table.csv') as dists_file:
             locations = []
             reader = csv.reader(dists_file, delimiter=',', quotechar='"')
@@ -75,43 +198,240 @@ class Simulator:
         """
         Loads information about the packages from 'data/wgups_packages.csv' as Package
         objects into a list and into a hashtable. The hashtable groups packages according
-        to their destination addresses.
+        to their destination addresses. The file is read only once; later runs and forks
+        create the packages from the lines read then.
 
         Either space or time complexity is O(n)
         """
         self._packages = HashTable()
         destinations = HashTable()
-        associated_packages = HashTable()
 
-        with open('data/wgups_packages.csv') as pkgs_file:
-            reader = csv.reader(pkgs_file, delimiter=',')
+        if self._manifest is None:
+            with open('data/wgups_packages.csv') as pkgs_file:
+                self._manifest = [tuple(line) for line in csv.reader(pkgs_file, delimiter=',')]
 
-            for line in reader:
-                package = Package(*line)
+        for line in self._manifest:
+            package = Package(*line)
 
-                self._packages.put(package.get_id_no(), package)
+            arrival = self._arrivals.get(package.get_id_no())
+            if arrival is not None:
+                package.delay_until(arrival)
 
-                dest_packages = destinations.get(package.get_address())
+            self._packages.put(package.get_id_no(), package)
 
-                if (dest_packages) is None:
-                    dest_packages = []
-                    destinations.put(package.get_address(), dest_packages)
+            dest_packages = destinations.get(package.get_address())
 
-                dest_packages.append(package)
+            if (dest_packages) is None:
+                dest_packages = []
+                destinations.put(package.get_address(), dest_packages)
 
-                for associated in package.get_associated_packages():
-                    assoc_set = associated_packages.get(associated)
-                    if assoc_set is None:
-                        assoc_set = set()
-                        associated_packages.put(associated, assoc_set)
-                    assoc_set.add(package)
+            dest_packages.append(package)
 
-                for pkg in associated_packages.get(package.get_id_no()) or []:
+        # Link packages that must be delivered together, in both directions, once all
+        # packages exist (a note may name packages listed before or after it).
+        for (_, package) in self._packages:
+            for associated in package.get_associated_packages():
+                pkg = self._packages.get(associated)
+                if pkg is not None:
                     pkg.associated.add(package)
                     package.associated.add(pkg)
 
         return destinations
 
+    def _assign_depots(self, packages) -> None:
+        """
+        Assigns the given packages to depots by partitioning their destinations
+        according to the nearest depot (a Voronoi partition over the distance table).
+        Packages that must go together are kept on the same depot, and packages that
+        require a specific truck go to that truck's depot. With a single depot nothing
+        is assigned, so any truck may deliver any package. A package whose depot cannot
+        make its deadline is later released to all depots (see _rebalance_if_needed).
+
+        Time complexity is O(n * d), where n and d represent number of packages and
+        number of depots respectively.
+        """
+        depots = [depot for depot in self._depots if depot.has_trucks()]
+        if len(depots) < 2:
+            return
+
+        for package in packages:
+            group = self._delivery_group(package)
+            depot = self._depot_of_required_truck(group)
+
+            if depot is None:
+                min_distance = float('inf')
+                for candidate in depots:
+                    distances = [self._graph.get_distance(p.get_address(), candidate.get_address()) for p in group]
+                    # Destinations missing from the table (such as a wrong address) can
+                    # be delivered from any depot until they are corrected.
+                    if None in distances:
+                        depot = None
+                        break
+                    if sum(distances) < min_distance:
+                        min_distance = sum(distances)
+                        depot = candidate
+
+            for p in group:
+                p.set_depot(depot)
+
+    def _rebalance_if_needed(self, package) -> bool:
+        """
+        Releases the given package (with the packages that must go with it) to the trucks
+        of every depot when no truck of its own depot can deliver it before its deadline
+        anymore, even by driving straight to it once the truck is back at the depot.
+        Packages that require a specific truck stay with that truck's depot. Returns
+        True if the package is not assigned to a depot (anymore).
+
+        Time complexity is O(t + g), where g is the size of the package's group.
+        """
+        depot = package.get_depot()
+        if depot is None:
+            return True
+
+        group = self._delivery_group(package)
+        if any(p.get_required_truck() is not None for p in group):
+            return False
+
+        distance = self._graph.get_distance(depot.get_address(), package.get_address())
+        if distance is None:
+            return False
+
+        earliest_departure = max(package.get_available_at(), min(t.get_time() for t in depot.get_trucks()))
+        if earliest_departure + distance / Truck._speed * 60 < package.deadline:
+            return False
+
+        for p in group:
+            p.set_depot(None)
+        return True
+
+    def _delivery_group(self, package) -> set:
+        """
+        Returns the given package together with all packages that must be delivered with it.
+
+        Time complexity is O(g), where g is the size of the group.
+        """
+        group = {package}
+        pending = [package]
+        while len(pending) != 0:
+            for assoc_pkg in pending.pop().associated:
+                if assoc_pkg not in group:
+                    group.add(assoc_pkg)
+                    pending.append(assoc_pkg)
+        return group
+
+    def _group_fits(self, truck, package) -> bool:
+        """
+        Returns True if the given truck has space for the given package together with
+        the packages at the hub that must be delivered with it.
+        """
+        if len(package.associated) == 0:
+            return not truck.isfull()
+
+        group = [p for p in self._delivery_group(package) if p.at_the_hub()]
+        return truck.available_space() >= len(group)
+
+    def _depot_of_required_truck(self, packages) -> Depot:
+        """
+        Returns the home depot of the truck required by any of the given packages,
+        or None if none of them requires a specific truck.
+        """
+        for package in packages:
+            for truck in self._trucks:
+                if truck.get_id() == package.get_required_truck():
+                    return truck.get_depot()
+        return None
+
+    def _cluster_packages_by_location(self, destinations) -> None:
+        """
+        Partitions the delivery locations into geographic clusters of about one truck
+        load each, so that a truck looks for its next package among the packages of the
+        cluster it is working on instead of among all packages. Packages that must be
+        delivered together are kept in the same cluster. Deadlines and truck restrictions
+        are unaffected: urgent packages are loaded before clustering applies, and a truck
+        that cannot take any package of its cluster falls back to all packages.
+
+        With several depots, the packages of every depot are clustered separately
+        around that depot; packages not assigned to a depot count as the first one's.
+
+        Time complexity is O(n * d) plus that of clustering.partition_locations.
+        """
+        clusters = []
+        cluster_of_location = HashTable()
+        for depot in self._depots:
+            if not depot.has_trucks():
+                continue
+
+            locations = []
+            weights = []
+            for (address, packages) in destinations:
+                weight = len([p for p in packages if self._clustering_depot(p) is depot])
+                # Wrong addresses are clustered once they have been corrected.
+                if weight != 0 and self._graph.get_distance(depot.get_address(), address) is not None:
+                    locations.append(address)
+                    weights.append(weight)
+
+            for cluster in partition_locations(self._graph, depot.get_address(), locations, weights,
+                                               Truck._max_capacity):
+                for location in cluster:
+                    cluster_of_location.put((depot.get_address(), location), len(clusters))
+                clusters.append(cluster)
+
+        self._clusters = HashTable()
+        self._cluster_packages = [[] for _ in clusters]
+        for (address, packages) in destinations:
+            for package in packages:
+                depot = self._clustering_depot(package).get_address()
+                cluster = cluster_of_location.get((depot, address))
+                group = self._delivery_group(package)
+                if len(group) > 1:
+                    cluster = cluster_of_location.get((depot, min(group, key=Package.get_id_no).get_address()))
+                if cluster is not None:
+                    self._clusters.put(package.get_id_no(), cluster)
+                    self._cluster_packages[cluster].append(package)
+
+    def _clustering_depot(self, package) -> Depot:
+        """ Returns the depot around which the given package is clustered """
+        return package.get_depot() or self._depots[0]
+
+    def _add_to_nearest_cluster(self, package) -> None:
+        """
+        Puts a package whose address has been corrected in the cluster of the nearest
+        clustered package of the same depot.
+
+        Time complexity is O(n).
+        """
+        depot = self._clustering_depot(package)
+        nearest = self._package_nearest_to_location(
+            [p for cluster in self._cluster_packages for p in cluster if self._clustering_depot(p) is depot],
+            package.get_address())
+        if nearest is not None:
+            cluster = self._clusters.get(nearest.get_id_no())
+            self._clusters.put(package.get_id_no(), cluster)
+            self._cluster_packages[cluster].append(package)
+
+    def _candidate_packages(self, truck, remaining_packages, available) -> list:
+        """
+        Returns the packages the given truck picks its next package from, out of the
+        given set of packages available for it. In decomposition mode these are the
+        packages of the cluster of the truck's last loaded package, as long as that
+        cluster has any available for the truck. Otherwise all available remaining
+        packages are candidates. Packages that have left the hub are dropped from the
+        cluster as it is looked at.
+
+        Time complexity is O(c) in decomposition mode, where c is the number of packages
+        of the cluster still at the hub, and O(r) otherwise, where r is the number of
+        remaining packages.
+        """
+        if self._clusters is not None and not truck.isempty():
+            cluster = self._clusters.get(truck.get_packages()[-1].get_id_no())
+            if cluster is not None:
+                self._cluster_packages[cluster] = [p for p in self._cluster_packages[cluster] if p.at_the_hub()]
+                candidates = [p for p in self._cluster_packages[cluster] if p in available]
+                if len(candidates) != 0:
+                    return candidates
+
+        return [p for p in remaining_packages if p in available]
+
     def _package_nearest_to_location(self, packages, location) -> Package:
         """
         Returns the package that is nearest to the given location.
@@ -123,93 +443,197 @@ class Simulator:
         nearest_package = None
         for package in packages:
             distance = self._graph.get_distance(package.get_address(), location)
-            if distance < min_distance:
+            if distance is not None and distance < min_distance:
                 min_distance = distance
                 nearest_package = package
 
         return nearest_package
 
-    def _deliver_urgent_packages(self, destinations):
+    def _build_urgent_heap(self) -> None:
         """
-        Delivers urgent packages to their given destinations. Either time or space complexity is O(n)
-        """
-        urgent_packages = set()
+        Puts every package with a deadline into one of two heaps: packages that have
+        arrived go into the urgent heap, ordered by their latest dispatch time (their
+        deadline minus the travel time from their depot to their address), and those
+        that arrive later go into the arrivals heap, ordered by their arrival time.
 
+        Time complexity is O(n log n) while space complexity is O(n).
+        """
+        self._urgent_heap = []
+        self._arrivals_heap = []
+        start_of_day = min(truck.get_time() for truck in self._trucks)
         for p in self._packages:
-            if any([p[1].is_urgent(t.get_time()) and p[1].is_available(t) for t in self._trucks]):
-                urgent_packages.add(p[1])
+            if p[1].deadline >= EOD:
+                continue
+            if p[1].get_available_at() <= start_of_day:
+                self._push_urgent(p[1])
+            else:
+                heapq.heappush(self._arrivals_heap, (p[1].get_available_at(), p[1].get_id_no(), p[1]))
+
+    def _push_urgent(self, package) -> None:
+        """
+        Inserts the given package into the urgent heap. Time complexity is O(log n).
+        """
+        depot = package.get_depot() or self._depots[0]
+        distance = self._graph.get_distance(depot.get_address(), package.get_address())
+        travel_time = 0.0 if distance is None else distance / Truck._speed * 60
+        heapq.heappush(self._urgent_heap, (package.deadline - travel_time, package.get_id_no(), package))
+
+    def _release_arrivals(self) -> None:
+        """
+        Moves the packages that have arrived by the latest truck clock from the
+        arrivals heap into the urgent heap. Time complexity is O(log n) per package.
+        """
+        latest_time = max(truck.get_time() for truck in self._trucks)
+        while len(self._arrivals_heap) != 0 and self._arrivals_heap[0][0] <= latest_time:
+            self._push_urgent(heapq.heappop(self._arrivals_heap)[2])
+
+    def _deliver_urgent_packages(self, destinations):
+        """
+        Loads urgent packages into the trucks, the package with the earliest latest
+        dispatch time first, each into the truck with the least mileage that can take
+        it. A package is loaded together with the packages that must go with it, and
+        then the space left is filled with available packages destined to the same
+        addresses. Urgent packages that no truck can take now go back into the heap.
+
+        Time complexity is O(u log n) + O(u * t), where u and t represent number of
+        urgent packages examined and number of trucks respectively.
+        """
+        self._release_arrivals()
 
         # Sort the list of trucks according to their mileage so that
         # the trucks with the least mileage are loaded first.
 
         self._trucks.sort(key=lambda truck: truck.get_mileage())
 
-        for truck in self._trucks:
+        loaded_trucks = set()
+        not_loaded = []
+        while len(self._urgent_heap) != 0 and not all(truck.isfull() for truck in self._trucks):
+            package = heapq.heappop(self._urgent_heap)[2]
 
-            # Load packages into the truck until it's full or there are no more packages.
-            while not truck.isfull() and len(urgent_packages) != 0:
+            # ignore those that have been processed.
+            if not package.at_the_hub():
+                continue
 
-                nearest_package = self._package_nearest_to_location(urgent_packages, truck.location())
+            # A package released from its depot goes to the truck that can leave first.
+            trucks = self._trucks
+            if len(self._depots) > 1 and self._rebalance_if_needed(package):
+                trucks = sorted(self._trucks, key=lambda truck: truck.get_time())
 
-                # Determine all packages associated to the nearest package.
-                associated_pkgs = nearest_package.associated
-                for assoc_pkg in associated_pkgs:
-                    associated_pkgs = associated_pkgs.union(assoc_pkg.associated)
-                associated_pkgs.add(nearest_package)
+            for truck in trucks:
+                if package.is_available(truck) and self._group_fits(truck, package):
+                    loaded = self._load_group(truck, package)
 
-                # Load truck only if it has enough space for a package (including its associated packages).
-                if truck.available_space() >= len(associated_pkgs):
-                    while len(associated_pkgs) != 0:
+                    # Load other packages destined to same locations as the ones loaded.
+                    for pkg in loaded:
+                        for p in (destinations.get(pkg.get_address()) or []):
+                            if p.is_available(truck) and self._group_fits(truck, p):
+                                self._load_group(truck, p)
 
-                        # Note the main package that is nearest to the associated packages.
-                        pkg = self._package_nearest_to_location(associated_pkgs, truck.location())
-                        associated_pkgs.discard(pkg)
+                    loaded_trucks.add(truck)
+                    break
+            else:
+                not_loaded.append(package)
 
-                        # ignore those that have been processed.
-                        if not pkg.at_the_hub():
-                            continue
+        for package in not_loaded:
+            self._push_urgent(package)
 
-                        # Load the package into the truck and erase it from the urgent list.
-                        urgent_packages.discard(pkg)
-                        truck.load(pkg)
+        for truck in loaded_trucks:
+            self._sequence_nearest_first(truck)
 
-                        # Load other packages destined to same location as the one loaded earlier.
-                        for p in (destinations.get(pkg.get_address()) or []):
-                            if not truck.isfull() and p.is_available(truck):
-                                urgent_packages.discard(p)
-                                truck.load(p)
+    def _load_group(self, truck, package) -> list:
+        """
+        Loads the given package and the packages at the hub that must be delivered with
+        it into the given truck, nearest first, and returns the loaded packages. The
+        caller makes sure that they fit (see _group_fits).
+
+        Time complexity is O(g^2), where g is the size of the group.
+        """
+        associated_pkgs = sorted([p for p in self._delivery_group(package) if p.at_the_hub()], key=Package.get_id_no)
+        loaded = []
+        while len(associated_pkgs) != 0:
+            pkg = self._package_nearest_to_location(associated_pkgs, truck.location()) or associated_pkgs[0]
+            associated_pkgs.remove(pkg)
+            truck.load(pkg)
+            loaded.append(pkg)
+        return loaded
+
+    def _sequence_nearest_first(self, truck) -> None:
+        """
+        Reorders the packages loaded into the given truck so that it always drives to the
+        nearest remaining destination next, starting from its depot. If that order would
+        miss a deadline that the loading order meets, the loading order is kept.
+
+        Time complexity is O(p^2), where p is the number of packages in the truck.
+        """
+        remaining = list(truck.get_packages())
+        order = []
+        location = truck.get_depot().get_address()
+        while len(remaining) != 0:
+            nearest = self._package_nearest_to_location(remaining, location)
+            remaining.remove(nearest)
+            order.append(nearest)
+            location = nearest.get_address()
+
+        if self._missed_deadlines(truck, order) <= self._missed_deadlines(truck, truck.get_packages()):
+            truck.reorder(order)
+
+    def _missed_deadlines(self, truck, packages) -> int:
+        """
+        Returns how many of the given packages would be delivered late if the given
+        truck delivered them in the given order. Time complexity is O(p).
+        """
+        missed = 0
+        time = truck.get_time()
+        location = truck.get_depot().get_address()
+        for package in packages:
+            time += self._graph.get_distance(location, package.get_address()) / Truck._speed * 60
+            location = package.get_address()
+            if time >= package.deadline:
+                missed += 1
+        return missed
 
     def _transport_packages(self) -> int:
         """
-        Takes the packages to their destination. Either the time complexity or space complexity is O(n)
+        Takes the packages to their destination. Either the time complexity or space complexity is O(r * t)
+        per round, where r represents number of packages still at the hub.
         """
-        remaining_packages = []
-        for p in self._packages:
-            if p[1].at_the_hub():
-                remaining_packages.append(p[1])
+        self._remaining_packages = [p for p in self._remaining_packages if p.at_the_hub()]
+        remaining_packages = self._remaining_packages
+
+        # The packages each truck can take this round. The truck clocks do not change
+        # while loading, so loading a package only takes it out of these sets.
+        available = {}
+        for truck in self._trucks:
+            available[truck] = set(p for p in remaining_packages if p.is_available(truck))
 
         # If possible, share the packages among the trucks so that
         # the trucks use the least mileage possible.
 
         total = float('inf')
-        while total > 2:
+        loaded_any = True
+        while total > 2 and loaded_any:
             total = 0
+            loaded_any = False
             for truck in self._trucks:
                 if truck.isfull():
                     continue
+                # Every available package counts, also when the truck only picks from its cluster.
+                total += len(available[truck])
                 shortest = float('inf')
                 nearest_package = None
-                for p in remaining_packages:
-                    if p.is_available(truck):
-                        total += 1
-                        distance = self._graph.get_distance(
-                            truck.location(), p.get_address())
-                        if distance < shortest:
-                            shortest = distance
-                            nearest_package = p
+                for p in self._candidate_packages(truck, remaining_packages, available[truck]):
+                    distance = self._graph.get_distance(
+                        truck.location(), p.get_address())
+                    if distance is not None and distance < shortest and self._group_fits(truck, p):
+                        shortest = distance
+                        nearest_package = p
 
                 if nearest_package is not None:
-                    truck.load(nearest_package)
+                    # Packages that must be delivered together go onto the same truck.
+                    for loaded in self._load_group(truck, nearest_package):
+                        for packages in available.values():
+                            packages.discard(loaded)
+                    loaded_any = True
 
         # First update invalid addresses when the correct one is availed, and then
         # loops through all trucks in the trucks list to deliver packages.
@@ -224,16 +648,68 @@ class Simulator:
 
         for truck in self._trucks:
             packages_sent += len(truck.get_packages())
+            if self._sequencer is not None and not self._sequencer.sequence(truck):
+                self._sequence_nearest_first(truck)
             truck.deliver(self._graph)
 
             if len(self._packages_with_wrong_address) != 0:
                 for p in self._packages_with_wrong_address:
                     if p.correct_address_available(truck.get_time()):
                         p.update_address()
+                        self._assign_depots([p])
+                        if self._clusters is not None:
+                            self._add_to_nearest_cluster(p)
                         self._packages_with_wrong_address.remove(p)
 
+        if packages_sent == 0:
+            self._wait_for_next_package()
+
         return packages_sent
 
+    def _wait_for_next_package(self) -> None:
+        """
+        Keeps the trucks at their depots until the next package that is still at the
+        hub becomes available. Used when no truck could take any package, which happens
+        when the remaining packages arrive later than the trucks are back. Raises if an
+        available package cannot be routed because its distance is unknown.
+
+        Time complexity is O(n).
+        """
+        earliest_truck_time = min(truck.get_time() for truck in self._trucks)
+        next_available_at = float('inf')
+        for p in self._remaining_packages:
+            if not p.at_the_hub():
+                continue
+
+            # A package that became available during this round (such as one whose
+            # address was corrected) is loaded next round.
+            for truck in self._trucks:
+                if p.is_available(truck):
+                    if self._graph.get_distance(truck.location(), p.get_address()) is None:
+                        raise Exception(f'the distance from {truck.location()} to {p.get_address()} is unknown')
+                    return
+
+            if p.get_available_at() > earliest_truck_time:
+                next_available_at = min(next_available_at, p.get_available_at())
+
+        if next_available_at == float('inf'):
+            raise Exception('no truck can deliver the remaining packages')
+
+        for truck in self._trucks:
+            truck.wait_until(next_available_at)
+
+    def get_sequencer(self) -> LoadSequencer:
+        """ Returns the sequencer of truck loads, or None if exact sequencing is off """
+        return self._sequencer
+
+    def get_graph(self) -> Graph:
+        """ Returns the graph of distances between the locations """
+        return self._graph
+
+    def get_depots(self) -> [Depot]:
+        """ Returns the depots """
+        return self._depots
+
     def get_trucks(self) -> [Truck]:
         """ Returns the trucks - a Hashtable """
         return self._trucks